@@ -1,134 +1,454 @@
 # DJI Frame Geotagging Script
 # This script geotags DJI drone image frames using corresponding .SRT subtitle files.
-# It requires the 'piexif' and 'pysrt' libraries.
-# To install them, run: pip install piexif pysrt
+# It requires the 'piexif' and 'numpy' libraries.
+# To install them, run: pip install piexif numpy
 
 import os
 import re
-import pysrt
+import mmap
+import shutil
+import struct
+import hashlib
+import queue
+import argparse
+import threading
+import subprocess
+import numpy as np
 import piexif
 from datetime import timedelta
+from fractions import Fraction
+from itertools import repeat
 from collections import defaultdict
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+# --- Precompiled patterns for DJI SRT telemetry and frame filenames ---
+_TIME_RE = re.compile(r'(\d+):(\d+):(\d+)[,.](\d+)\s*-->\s*(\d+):(\d+):(\d+)[,.](\d+)')
+_BLOCK_SEP_RE = re.compile(r'\n\s*\n')
+# Every "key: number" telemetry pair (e.g. "[latitude: 35.99]", "abs_alt: 204.9]") in one scan
+_KV_RE = re.compile(r'(\w+):\s*([-\d.]+)')
+# Video prefix and frame number in one match (both _SE_ and non-_SE_ formats)
+_PREFIX_COMBINED_RE = re.compile(r'(DJI_\d+)_(?:SE_)?(\d+)\.jpg$', re.IGNORECASE)
+
+# Marks a subtitle whose text has already been parsed and holds no GPS data
+_SENTINEL = object()
+
+# Parsed SRT arrays are cached here (relative to the working folder) between runs
+SRT_CACHE_DIR = ".srt_cache"
+
+# EXIF writes are dominated by file I/O, so oversubscribe the CPU count
+MAX_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# --- SRT parsing ---
+def iter_srt(path):
+    """Yields (start_ms, end_ms, text) for each subtitle block in an SRT file."""
+    with open(path, 'r', encoding='utf-8-sig', errors='replace') as f:
+        content = f.read()
+
+    for block in _BLOCK_SEP_RE.split(content):
+        match = _TIME_RE.search(block)
+        if not match:
+            continue
+        h1, m1, s1, ms1, h2, m2, s2, ms2 = map(int, match.groups())
+        start_ms = ((h1 * 60 + m1) * 60 + s1) * 1000 + ms1
+        end_ms = ((h2 * 60 + m2) * 60 + s2) * 1000 + ms2
+        # Subtitle text is everything after the timing line
+        text = block[match.end():].strip('\n')
+        yield start_ms, end_ms, text
+
+def load_srt(path):
+    """Returns (starts, ends, texts, cached) for an SRT file, reusing a cache keyed by file mtime."""
+    abs_path = os.path.abspath(path)
+    mtime_ns = os.stat(abs_path).st_mtime_ns
+    cache_path = os.path.join(SRT_CACHE_DIR, hashlib.sha1(abs_path.encode('utf-8')).hexdigest() + ".npz")
+
+    try:
+        with np.load(cache_path) as cached:
+            if int(cached['mtime_ns']) == mtime_ns:
+                blob = cached['text_blob'].tobytes()
+                offsets = cached['text_offsets'].tolist()
+                texts = [blob[a:b].decode('utf-8') for a, b in zip(offsets, offsets[1:])]
+                return cached['starts'], cached['ends'], texts, True
+    except Exception:
+        pass  # Missing, stale format or corrupt cache: parse the file again and overwrite it
+
+    subs = list(iter_srt(abs_path))
+    starts = np.array([start_ms for start_ms, _, _ in subs], dtype=np.int64)
+    ends = np.array([end_ms for _, end_ms, _ in subs], dtype=np.int64)
+    texts = [text for _, _, text in subs]
+
+    # Store the texts as one compressed UTF-8 blob plus offsets rather than a
+    # fixed-width string array, and write to a temporary file first so an
+    # interrupted run never leaves a truncated cache
+    encoded = [text.encode('utf-8') for text in texts]
+    text_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=text_offsets[1:])
+    text_blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    try:
+        os.makedirs(SRT_CACHE_DIR, exist_ok=True)
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, mtime_ns=np.int64(mtime_ns), starts=starts, ends=ends,
+                                text_blob=text_blob, text_offsets=text_offsets)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"  -> Warning: Could not write SRT cache for {path}: {e}")
+
+    return starts, ends, texts, False
 
 # --- Helper functions for converting GPS data to EXIF format ---
 def to_deg(value, loc):
-    """Converts decimal coordinates to degrees, minutes, seconds."""
+    """Converts decimal coordinates to EXIF degree, minute, second rationals."""
     if value < 0:
         loc_value = loc[1]
     elif value > 0:
         loc_value = loc[0]
     else:
         loc_value = ""
-    abs_value = abs(value)
-    deg = int(abs_value)
-    t1 = (abs_value - deg) * 60
-    min = int(t1)
-    sec = round((t1 - min) * 60, 5)
-    return (deg, min, sec, loc_value)
+    # Work in integer units of 1/100000 arc second to avoid float rounding drift
+    units = int(round(abs(value) * 360_000_000))
+    deg, rem = divmod(units, 360_000_000)
+    minute, sec_scaled = divmod(rem, 6_000_000)
+    return ((deg, 1), (minute, 1), (sec_scaled, 100000), loc_value)
 
 def parse_dji_gps_data(srt_text):
     """Parse DJI SRT format to extract GPS coordinates and altitude."""
     try:
-        # Extract latitude
-        lat_match = re.search(r'\[latitude:\s*([-\d.]+)\]', srt_text)
-        # Extract longitude  
-        lon_match = re.search(r'\[longitude:\s*([-\d.]+)\]', srt_text)
-        # Extract both relative and absolute altitude
-        rel_alt_match = re.search(r'\[rel_alt:\s*([-\d.]+)', srt_text)
-        abs_alt_match = re.search(r'abs_alt:\s*([-\d.]+)\]', srt_text)
-        
-        if lat_match and lon_match and abs_alt_match:
-            lat = float(lat_match.group(1))
-            lon = float(lon_match.group(1))
-            abs_alt = float(abs_alt_match.group(1))
-            rel_alt = float(rel_alt_match.group(1)) if rel_alt_match else None
-            
-            return lat, lon, abs_alt, rel_alt
-        else:
+        fields = dict(_KV_RE.findall(srt_text))
+        if 'latitude' not in fields or 'longitude' not in fields or 'abs_alt' not in fields:
             return None
-            
+
+        lat = float(fields['latitude'])
+        lon = float(fields['longitude'])
+        abs_alt = float(fields['abs_alt'])
+        rel_alt = float(fields['rel_alt']) if 'rel_alt' in fields else None
+
+        return lat, lon, abs_alt, rel_alt
+
     except (ValueError, AttributeError):
         return None
 
-def set_gps_location(file_path, lat, lon, abs_alt, rel_alt=None):
-    """Writes GPS data to an image file's EXIF tags using absolute altitude."""
+def find_exif_segment(jpeg_data):
+    """Returns (start, end) of the EXIF APP1 segment, or (None, insert_at) if there is none."""
+    if jpeg_data[0:2] != b"\xff\xd8":
+        raise ValueError("Not a JPEG file")
+
+    # Walk the marker segments up to the start of the compressed image data
+    insert_at = 2
+    pos = 2
+    while pos + 4 <= len(jpeg_data):
+        if jpeg_data[pos] != 0xFF:
+            raise ValueError("Malformed JPEG marker segment")
+        marker = jpeg_data[pos + 1]
+        if marker in (0xDA, 0xD9):  # Start of scan / end of image
+            break
+        end = pos + 2 + struct.unpack(">H", jpeg_data[pos + 2:pos + 4])[0]
+        if marker == 0xE1 and jpeg_data[pos + 4:pos + 10] == b"Exif\x00\x00":
+            return pos, end
+        if marker == 0xE0:  # Keep a JFIF APP0 header first
+            insert_at = end
+        pos = end
+
+    return None, insert_at
+
+def splice_exif_segment(jpeg_data, exif_bytes):
+    """Returns JPEG data with its EXIF APP1 segment replaced by (or given) exif_bytes."""
+    if len(exif_bytes) + 2 > 0xFFFF:
+        raise ValueError("EXIF data too large for a single APP1 segment")
+
+    segment = b"\xff\xe1" + struct.pack(">H", len(exif_bytes) + 2) + exif_bytes
+    start, end = find_exif_segment(jpeg_data)
+    if start is None:
+        # No existing EXIF segment, so insert a new one
+        return jpeg_data[:end] + segment + jpeg_data[end:]
+    return jpeg_data[:start] + segment + jpeg_data[end:]
+
+def _dms_to_decimal(dms, ref, negative_ref):
+    """Converts EXIF degree, minute, second rationals and a hemisphere ref to decimal degrees."""
+    (deg, deg_den), (minute, minute_den), (sec, sec_den) = dms
+    value = deg / deg_den + minute / minute_den / 60 + sec / sec_den / 3600
+    return -value if ref == negative_ref else value
+
+def _gps_equal(gps_ifd, lat, lon, alt, tolerance=1e-6):
+    """Returns True if an existing GPS IFD already holds these coordinates (within tolerance degrees)."""
     try:
-        lat_deg = to_deg(lat, ["N", "S"])
-        lon_deg = to_deg(lon, ["E", "W"])
+        existing_lat = _dms_to_decimal(gps_ifd[piexif.GPSIFD.GPSLatitude], gps_ifd[piexif.GPSIFD.GPSLatitudeRef], b"S")
+        existing_lon = _dms_to_decimal(gps_ifd[piexif.GPSIFD.GPSLongitude], gps_ifd[piexif.GPSIFD.GPSLongitudeRef], b"W")
+        alt_num, alt_den = gps_ifd[piexif.GPSIFD.GPSAltitude]
+        existing_alt = alt_num / alt_den
+    except (KeyError, TypeError, ValueError, ZeroDivisionError):
+        return False
 
-        exif_dict = piexif.load(file_path)
-        
-        # Convert absolute altitude to EXIF format (rational number)
-        abs_alt_rational = (int(abs_alt * 100), 100)
-
-        gps_ifd = {
-            piexif.GPSIFD.GPSLatitudeRef: lat_deg[3].encode('utf-8'),
-            piexif.GPSIFD.GPSLatitude: ((lat_deg[0], 1), (lat_deg[1], 1), (int(lat_deg[2] * 100000), 100000)),
-            piexif.GPSIFD.GPSLongitudeRef: lon_deg[3].encode('utf-8'),
-            piexif.GPSIFD.GPSLongitude: ((lon_deg[0], 1), (lon_deg[1], 1), (int(lon_deg[2] * 100000), 100000)),
-            piexif.GPSIFD.GPSAltitudeRef: 0,  # 0 = Above sea level
-            piexif.GPSIFD.GPSAltitude: abs_alt_rational,  # Using absolute altitude
-        }
-        
+    # Altitude is stored rounded to centimetres
+    return (abs(existing_lat - lat) <= tolerance
+            and abs(existing_lon - lon) <= tolerance
+            and gps_ifd.get(piexif.GPSIFD.GPSAltitudeRef, 0) == 0
+            and abs(existing_alt - alt) <= 0.01)
+
+def _has_non_gps_exif(exif_dict):
+    """Returns True if a loaded EXIF dict holds anything besides GPS tags and the GPS IFD pointer."""
+    if exif_dict.get("thumbnail") or any(exif_dict.get(ifd) for ifd in ("Exif", "Interop", "1st")):
+        return True
+    return any(tag != piexif.ImageIFD.GPSTag for tag in exif_dict.get("0th", {}))
+
+@lru_cache(maxsize=1024)
+def gps_exif_payload(lat, lon, alt_cm):
+    """Returns (gps_ifd, exif_bytes) for a position, where exif_bytes holds only the GPS tags.
+
+    Consecutive frames usually share one subtitle's position, so the encoded
+    EXIF is built once per position and reused for every image without other EXIF data.
+    """
+    lat_deg = to_deg(lat, ["N", "S"])
+    lon_deg = to_deg(lon, ["E", "W"])
+
+    # Absolute altitude in centimetres as an EXIF rational number
+    abs_alt_rational = (alt_cm, 100)
+
+    gps_ifd = {
+        piexif.GPSIFD.GPSLatitudeRef: lat_deg[3].encode('utf-8'),
+        piexif.GPSIFD.GPSLatitude: lat_deg[:3],
+        piexif.GPSIFD.GPSLongitudeRef: lon_deg[3].encode('utf-8'),
+        piexif.GPSIFD.GPSLongitude: lon_deg[:3],
+        piexif.GPSIFD.GPSAltitudeRef: 0,  # 0 = Above sea level
+        piexif.GPSIFD.GPSAltitude: abs_alt_rational,  # Using absolute altitude
+    }
+    return gps_ifd, piexif.dump({"GPS": gps_ifd})
+
+def build_exif_bytes(file_path, lat, lon, abs_alt, force=False, alt_cm=None):
+    """Returns the EXIF payload to write into an image, or None if its GPS tags already match.
+
+    Only the existing EXIF segment is read, and any non-GPS EXIF data in it is kept.
+    alt_cm is the altitude already rounded to centimetres, when the caller has it.
+    """
+    if alt_cm is None:
+        alt_cm = int(round(abs_alt * 100))
+    gps_ifd, exif_bytes = gps_exif_payload(lat, lon, alt_cm)
+
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start, end = find_exif_segment(mm)
+        if start is None:
+            return exif_bytes
+        exif_dict = piexif.load(mm[start + 4:end])
+
+    if not force and _gps_equal(exif_dict.get("GPS"), lat, lon, abs_alt):
+        return None
+    # Keep any other EXIF data; GPS-only EXIF can reuse the shared payload
+    if _has_non_gps_exif(exif_dict):
         exif_dict["GPS"] = gps_ifd
         exif_bytes = piexif.dump(exif_dict)
-        piexif.insert(exif_bytes, file_path)
-        return True
-        
-    except Exception as e:
-        print(f"  -> Error writing EXIF data to {file_path}: {e}")
-        return False
+    return exif_bytes
 
-def extract_video_prefix(filename):
-    """Extract DJI video prefix from filename (e.g., 'DJI_0609_SE_000001.jpg' or 'DJI_0609_000001.jpg' -> 'DJI_0609')"""
-    # Try pattern with _SE_ first (original format)
-    match = re.match(r'(DJI_\d+)_SE_\d+\.jpg$', filename, re.IGNORECASE)
-    if match:
-        return match.group(1)
-    
-    # Try pattern without _SE_ (alternative format)
-    match = re.match(r'(DJI_\d+)_\d+\.jpg$', filename, re.IGNORECASE)
-    return match.group(1) if match else None
-
-def extract_frame_number(filename):
-    """Extract frame number from filename (e.g., 'DJI_0609_SE_000001.jpg' or 'DJI_0609_000001.jpg' -> 1)"""
-    # Try pattern with _SE_ first (original format)
-    match = re.search(r'_SE_(\d+)\.jpg$', filename, re.IGNORECASE)
-    if match:
-        return int(match.group(1))
-    
-    # Try pattern without _SE_ (alternative format)
-    match = re.search(r'_([^_]+)\.jpg$', filename, re.IGNORECASE)
-    if match:
-        try:
-            return int(match.group(1))
-        except ValueError:
-            return None
+def write_exif_bytes(file_path, exif_bytes):
+    """Writes a prepared EXIF payload into an image, raising on failure."""
+    # Map the file so only the EXIF segment has to be read, and patch it in
+    # place when the new EXIF data has exactly the same size as the old
+    with open(file_path, 'r+b') as f, mmap.mmap(f.fileno(), 0) as mm:
+        start, end = find_exif_segment(mm)
+        if start is not None and end - start - 4 == len(exif_bytes):
+            if mm[start + 4:end] != exif_bytes:
+                mm[start + 4:end] = exif_bytes
+                mm.flush()
+            return
+        jpeg_data = mm[:]
+
+    # The EXIF layout changed (or there was none): rebuild the file in one write
+    new_data = splice_exif_segment(jpeg_data, exif_bytes)
+    with open(file_path, 'wb') as f:
+        f.write(new_data)
+
+def write_gps_location(file_path, lat, lon, abs_alt, rel_alt=None, force=False, alt_cm=None):
+    """Writes GPS data to an image file's EXIF tags using absolute altitude, raising on failure.
+
+    Files that already carry matching GPS tags are left untouched unless force is set.
+    """
+    exif_bytes = build_exif_bytes(file_path, lat, lon, abs_alt, force=force, alt_cm=alt_cm)
+    if exif_bytes is not None:
+        write_exif_bytes(file_path, exif_bytes)
+
+class ExifToolWriter:
+    """Writes GPS tags through a single long-running 'exiftool -stay_open' process."""
+
+    def __init__(self, executable="exiftool"):
+        self.process = subprocess.Popen(
+            [executable, '-stay_open', 'True', '-@', '-'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            encoding='utf-8',
+        )
+
+    def execute(self, *args):
+        """Runs one exiftool command and returns its output."""
+        self.process.stdin.write("\n".join(args) + "\n-execute\n")
+        self.process.stdin.flush()
+
+        output = []
+        for line in self.process.stdout:
+            if line.strip() == "{ready}":
+                return "".join(output)
+            output.append(line)
+        raise RuntimeError("exiftool exited unexpectedly")
+
+    def write_gps_location(self, file_path, lat, lon, abs_alt, rel_alt=None):
+        """Writes GPS data to an image file's EXIF tags using absolute altitude, raising on failure."""
+        output = self.execute(
+            f"-GPSLatitude={abs(lat)}",
+            f"-GPSLatitudeRef={'S' if lat < 0 else 'N'}",
+            f"-GPSLongitude={abs(lon)}",
+            f"-GPSLongitudeRef={'W' if lon < 0 else 'E'}",
+            f"-GPSAltitude={abs_alt}",
+            "-GPSAltitudeRef#=0",  # 0 = Above sea level
+            "-overwrite_original",
+            file_path,
+        )
+        if "1 image files updated" not in output:
+            raise RuntimeError(output.strip() or "exiftool did not update the file")
+
+    def close(self):
+        """Asks exiftool to exit and waits for the process to finish."""
+        if self.process.poll() is None:
+            self.process.stdin.write("-stay_open\nFalse\n")
+            self.process.stdin.flush()
+            self.process.stdin.close()
+            self.process.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def write_with_thread_pool(work, force=False):
+    """Writes GPS data for each (path, gps, alt_cm) item on a thread pool, yielding (path, error)."""
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = {
+            executor.submit(write_gps_location, full_image_path, *gps_result, force=force, alt_cm=alt_cm): full_image_path
+            for full_image_path, gps_result, alt_cm in work
+        }
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                yield futures[future], e
+            else:
+                yield futures[future], None
+
+def _write_gps(full_image_path, gps_result, alt_cm, force=False):
+    """Process pool task: writes GPS data and returns an error message, or None on success."""
+    try:
+        write_gps_location(full_image_path, *gps_result, force=force, alt_cm=alt_cm)
+    except Exception as e:
+        return str(e)
     return None
 
-def geotag_dji_frames():
+def write_with_process_pool(work, force=False):
+    """Writes GPS data for each (path, gps, alt_cm) item on a process pool, yielding (path, error)."""
+    if not work:
+        return
+    workers = os.cpu_count() or 1
+    paths, gps_results, alt_cms = zip(*work)
+    # Hand out several images per task to amortize pickling overhead
+    chunksize = max(1, len(work) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from zip(paths, executor.map(_write_gps, paths, gps_results, alt_cms, repeat(force), chunksize=chunksize))
+
+def write_with_pipeline(work, force=False):
+    """Builds EXIF payloads on this thread while a writer thread splices them into files, yielding (path, error)."""
+    pending = queue.Queue(maxsize=64)
+    results = queue.Queue()
+
+    def consumer():
+        while True:
+            item = pending.get()
+            if item is None:  # Sentinel: producer is done
+                return
+            full_image_path, exif_bytes = item
+            try:
+                write_exif_bytes(full_image_path, exif_bytes)
+            except Exception as e:
+                results.put((full_image_path, e))
+            else:
+                results.put((full_image_path, None))
+
+    writer = threading.Thread(target=consumer, daemon=True)
+    writer.start()
+    try:
+        for full_image_path, (lat, lon, abs_alt, _), alt_cm in work:
+            # Read the existing EXIF and encode the new payload here; the
+            # writer thread only splices the finished bytes into the file
+            try:
+                exif_bytes = build_exif_bytes(full_image_path, lat, lon, abs_alt, force=force, alt_cm=alt_cm)
+            except Exception as e:
+                yield full_image_path, e
+                continue
+            if exif_bytes is None:  # GPS tags already match
+                yield full_image_path, None
+            else:
+                pending.put((full_image_path, exif_bytes))
+            while not results.empty():
+                yield results.get()
+    finally:
+        pending.put(None)
+        writer.join()
+    while not results.empty():
+        yield results.get()
+
+def write_with_exiftool(work, force=False):
+    """Writes GPS data for each (path, gps, alt_cm) item through exiftool, yielding (path, error).
+
+    exiftool always rewrites the tags and formats the altitude itself, so force and alt_cm are unused here.
+    """
+    with ExifToolWriter() as exiftool:
+        for full_image_path, gps_result, _ in work:
+            try:
+                exiftool.write_gps_location(full_image_path, *gps_result)
+            except Exception as e:
+                yield full_image_path, e
+            else:
+                yield full_image_path, None
+
+# EXIF writer backends selectable from the command line
+WRITE_BACKENDS = {
+    "piexif": write_with_thread_pool,
+    "processes": write_with_process_pool,
+    "pipeline": write_with_pipeline,
+    "exiftool": write_with_exiftool,
+}
+
+def geotag_dji_frames(backend="piexif", quiet=False, force=False):
     """Finds DJI images and SRT files in the current directory and geotags them."""
     
+    if backend == "exiftool" and not shutil.which("exiftool"):
+        print("Error: exiftool backend selected but 'exiftool' was not found on PATH. Exiting.")
+        return
+    write_batch = WRITE_BACKENDS[backend]
+
     current_folder = os.getcwd()
+    folder_prefix = current_folder + os.sep
     print(f"Searching for DJI images and .SRT files in: {current_folder}")
 
-    # 1. Find SRT files and group images by video prefix
+    # 1. Find SRT files and group image names and frame numbers by video prefix
     srt_files = {}
-    image_groups = defaultdict(list)
+    image_groups = defaultdict(lambda: ([], []))
     
-    for f in sorted(os.listdir(current_folder)):
-        if f.lower().endswith(".srt") and f.startswith("DJI_"):
-            # Extract prefix from SRT file (e.g., DJI_0609.SRT -> DJI_0609)
-            prefix = f[:-4]  # Remove .SRT extension
-            srt_files[prefix] = f
-            
-        elif f.lower().endswith(".jpg") and f.startswith("DJI_"):
-            # Group images by their video prefix (both _SE_ and non-_SE_ formats)
-            prefix = extract_video_prefix(f)
-            if prefix:
-                frame_num = extract_frame_number(f)
-                if frame_num is not None:
-                    image_groups[prefix].append((f, frame_num))
+    with os.scandir(current_folder) as it:
+        for entry in it:
+            name = entry.name
+            if not name.startswith("DJI_"):
+                continue
+            ext = name[-4:].lower()
+            if ext == ".srt":
+                # Extract prefix from SRT file (e.g., DJI_0609.SRT -> DJI_0609)
+                srt_files[name[:-4]] = name
+            elif ext == ".jpg":
+                # Group images by their video prefix (both _SE_ and non-_SE_ formats)
+                match = _PREFIX_COMBINED_RE.match(name)
+                if match:
+                    prefix, frame_number = match.groups()
+                    names, frame_list = image_groups[prefix]
+                    names.append(name)
+                    frame_list.append(int(frame_number))
 
     if not srt_files:
         print("Error: No DJI .SRT files found in this folder. Exiting.")
@@ -140,11 +460,15 @@ def geotag_dji_frames():
 
     # Match SRT files with image groups
     matched_groups = {}
-    for prefix in srt_files:
+    for prefix in sorted(srt_files):
         if prefix in image_groups:
+            names, frame_list = image_groups[prefix]
+            frame_nums = np.array(frame_list, dtype=np.int64)
+            order = np.argsort(frame_nums, kind='stable')  # Sort by frame number
             matched_groups[prefix] = {
                 'srt_file': srt_files[prefix],
-                'images': sorted(image_groups[prefix], key=lambda x: x[1])  # Sort by frame number
+                'names': [names[i] for i in order.tolist()],
+                'frame_nums': frame_nums[order],
             }
 
     if not matched_groups:
@@ -155,7 +479,7 @@ def geotag_dji_frames():
 
     print(f"\nFound {len(matched_groups)} video groups:")
     for prefix, data in matched_groups.items():
-        print(f"  {prefix}: {len(data['images'])} images, SRT: {data['srt_file']}")
+        print(f"  {prefix}: {len(data['names'])} images, SRT: {data['srt_file']}")
 
     # 2. Get video properties from user
     print("\n--- Video Frame Rate Settings ---")
@@ -185,6 +509,10 @@ def geotag_dji_frames():
     print(f"Original video: {video_fps} fps")
     print(f"Frame extraction: {extraction_fps} fps (every {video_fps/extraction_fps:.1f} frames)")
 
+    # Extraction rate as an exact fraction for integer frame timestamp arithmetic
+    extraction_fraction = Fraction(extraction_fps).limit_denominator(1000)
+    fps_num, fps_den = extraction_fraction.numerator, extraction_fraction.denominator
+
     # 3. Process each video group
     total_success = 0
     total_images = 0
@@ -192,56 +520,81 @@ def geotag_dji_frames():
     for prefix, data in matched_groups.items():
         print(f"\n--- Processing {prefix} ---")
         srt_file = data['srt_file']
-        images = data['images']
+        names = data['names']
+        frame_nums = data['frame_nums']
         
-        # Parse the SRT file
+        # Parse the SRT file (or reuse the cached arrays from a previous run).
+        # Subtitle boundaries are kept as arrays so each frame can be located
+        # by binary search instead of scanning every subtitle entry
         try:
-            subs = pysrt.open(srt_file)
-            print(f"Successfully parsed {srt_file} ({len(subs)} subtitle entries)")
+            starts, ends, texts, cached = load_srt(srt_file)
+            cached_str = " from cache" if cached else ""
+            print(f"Successfully parsed {srt_file}{cached_str} ({len(texts)} subtitle entries)")
         except Exception as e:
             print(f"Error parsing {srt_file}: {e}")
             continue
 
-        # Process each image in this group
+        gps_cache = [None] * len(texts)  # Parsed GPS per subtitle index, filled lazily
+
+        # Map every frame in the group to its subtitle index in one pass.
+        # Frame numbering is 1-based, so subtract 1 for 0-based calculation.
+        # The frame time (frame - 1) * 1000 / fps is kept as an exact rational:
+        # a subtitle contains it when start <= floor(time) and ceil(time) <= end.
+        # As in the original linear scan, the first matching subtitle wins, so a
+        # frame exactly on a shared boundary (end[i] == start[i+1]) uses subtitle i
+        scaled_ms = (frame_nums - 1) * (1000 * fps_den)
+        frame_ms = scaled_ms // fps_num
+        frame_ms_ceil = -(-scaled_ms // fps_num)
+        sub_idx = np.searchsorted(ends, frame_ms_ceil, side='left')
+        valid = sub_idx < len(ends)
+        valid[valid] = starts[sub_idx[valid]] <= frame_ms[valid]
+        total_images += len(names)
+
+        # Hoist the per-frame values out of numpy once so the loops below
+        # work on plain Python ints instead of indexing arrays element by element
+        frame_list = frame_nums.tolist()
+        sub_idx_list = sub_idx.tolist()
+
+        for i in np.flatnonzero(~valid).tolist():
+            print(f"  -> Warning: No matching GPS data found for {names[i]} (frame {frame_list[i]}, time: {frame_ms[i] / 1000:.3f}s)")
+
+        # Resolve GPS data for each matched image in this group
         group_success = 0
-        for img_filename, frame_number in images:
-            total_images += 1
-            
-            # Calculate the timestamp of the current frame using extraction rate
-            # Frame numbering is 1-based, so subtract 1 for 0-based calculation
-            frame_time_seconds = (frame_number - 1) / extraction_fps
-            frame_timedelta_ms = frame_time_seconds * 1000  # Convert to milliseconds for SRT comparison
-            
-            # Find the subtitle entry that contains this frame's timestamp
-            gps_data_found = False
-            for sub in subs:
-                # Convert SRT timedelta to milliseconds
-                sub_start_ms = sub.start.ordinal
-                sub_end_ms = sub.end.ordinal
-                
-                if sub_start_ms <= frame_timedelta_ms <= sub_end_ms:
-                    # Parse DJI GPS data from this subtitle
-                    gps_result = parse_dji_gps_data(sub.text)
-                    if gps_result:
-                        lat, lon, abs_alt, rel_alt = gps_result
-                        
-                        full_image_path = os.path.join(current_folder, img_filename)
-                        rel_alt_str = f", Rel: {rel_alt}m" if rel_alt is not None else ""
-                        print(f"  Tagging {img_filename} (frame {frame_number}) with Lat: {lat}, Lon: {lon}, Alt: {abs_alt}m{rel_alt_str}")
-                        
-                        if set_gps_location(full_image_path, lat, lon, abs_alt, rel_alt):
-                            group_success += 1
-                            total_success += 1
-                        gps_data_found = True
-                        break
-                    else:
-                        print(f"  -> Warning: Could not parse GPS data from SRT entry: '{sub.text[:50]}...'")
-                        break
-            
-            if not gps_data_found:
-                print(f"  -> Warning: No matching GPS data found for {img_filename} (frame {frame_number}, time: {frame_time_seconds:.3f}s)")
+        work = []
+        for i in np.flatnonzero(valid).tolist():
+            img_filename, frame_number, idx = names[i], frame_list[i], sub_idx_list[i]
+
+            # Parse DJI GPS data from this subtitle
+            # (cached, as consecutive frames usually share the same subtitle)
+            gps_result = gps_cache[idx]
+            if gps_result is None:
+                gps_result = parse_dji_gps_data(texts[idx]) or _SENTINEL
+                gps_cache[idx] = gps_result
+            if gps_result is _SENTINEL:
+                print(f"  -> Warning: Could not parse GPS data from SRT entry: '{texts[idx][:50]}...'")
+                continue
+
+            if not quiet:
+                lat, lon, abs_alt, rel_alt = gps_result
+                rel_alt_str = f", Rel: {rel_alt}m" if rel_alt is not None else ""
+                print(f"  Tagging {img_filename} (frame {frame_number}) with Lat: {lat}, Lon: {lon}, Alt: {abs_alt}m{rel_alt_str}")
+            work.append((folder_prefix + img_filename, gps_result))
+
+        # Round all altitudes to centimetre EXIF numerators in one batch
+        alts = np.array([gps_result[2] for _, gps_result in work], dtype=np.float64)
+        alt_cms = np.rint(alts * 100).astype(np.int64).tolist()
+        work = [(full_image_path, gps_result, alt_cm)
+                for (full_image_path, gps_result), alt_cm in zip(work, alt_cms)]
+
+        # Write EXIF data; results are reported from this thread only
+        for full_image_path, error in write_batch(work, force):
+            if error:
+                print(f"  -> Error writing EXIF data to {full_image_path}: {error}")
+                continue
+            group_success += 1
+            total_success += 1
         
-        print(f"  Group {prefix}: Successfully geotagged {group_success} of {len(images)} images")
+        print(f"  Group {prefix}: Successfully geotagged {group_success} of {len(names)} images")
 
     print("\n=== GEOTAGGING COMPLETE ===")
     print(f"Successfully geotagged {total_success} of {total_images} images across {len(matched_groups)} videos.")
@@ -249,4 +602,14 @@ def geotag_dji_frames():
 
 # --- Run the main function ---
 if __name__ == "__main__":
-    geotag_dji_frames()
+    parser = argparse.ArgumentParser(description="Geotag DJI image frames using GPS data from matching .SRT files.")
+    parser.add_argument("--backend", choices=sorted(WRITE_BACKENDS), default="piexif",
+                        help="EXIF writer: piexif on a thread pool (default), piexif on a "
+                             "process pool, a two-stage encode/write pipeline, or a "
+                             "persistent exiftool process")
+    parser.add_argument("--quiet", action="store_true",
+                        help="Do not print a line for every tagged image")
+    parser.add_argument("--force", action="store_true",
+                        help="Rewrite GPS tags even on images that already have matching coordinates")
+    args = parser.parse_args()
+    geotag_dji_frames(backend=args.backend, quiet=args.quiet, force=args.force)